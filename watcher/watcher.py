@@ -1,13 +1,24 @@
 #!/usr/bin/env python3
 import os
+import sys
 import time
 import json
+import queue
+import threading
 import requests
-import re
-from collections import deque
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
 
 class LogWatcher:
+    READ_CHUNK_SIZE = 64 * 1024
+    LOG_FIELDS = ('pool', 'release', 'upstream_status', 'upstream', 'request_time', 'upstream_response_time')
+
     def __init__(self):
         self.webhook_url = os.getenv('SLACK_WEBHOOK_URL', '')
         self.error_threshold = float(os.getenv('ERROR_RATE_THRESHOLD', 2))
@@ -16,40 +27,98 @@ class LogWatcher:
         self.log_file = '/var/log/nginx/access.log'
 
 
-        self.request_window = deque(maxlen=self.window_size)
+        # Ring of 0/1 error flags; error_count is kept in step as slots are overwritten
+        self.request_window = bytearray(self.window_size)
+        self.window_pos = 0
+        self.window_filled = 0
+        self.error_count = 0
         self.last_pool = None
         self.last_alert_time = {}
+        self.inotify = self.open_inotify()
+
+        self.session = self.build_session()
+        self.alert_queue = queue.Queue(maxsize=64)
+        threading.Thread(target=self.alert_worker, daemon=True).start()
     
 
+    def open_inotify(self):
+        """Watch the log directory so we wake on writes and rotations instead of polling"""
+        if INotify is None:
+            return None
+        try:
+            inotify = INotify()
+            inotify.add_watch(
+                os.path.dirname(self.log_file),
+                flags.MODIFY | flags.CREATE | flags.MOVED_TO | flags.DELETE
+            )
+            return inotify
+        except OSError as e:
+            print(f"⚠️ inotify unavailable ({e}), falling back to polling")
+            return None
+
+    def wait_for_changes(self, poll_interval):
+        if self.inotify is None:
+            time.sleep(poll_interval)
+            return
+        # The timeout is only a safety net; events normally wake us first
+        self.inotify.read(timeout=5000)
+
     def parse_log_line(self, line):
-        pattern = (
-            r'pool="([^"]*)" release="([^"]*)" upstream_status="([^"]*)" '
-            r'upstream="([^"]*)" request_time="([^"]*)" upstream_response_time="([^"]*)"'
-        )
-        match = re.search(pattern, line)
-        if match:
-            return {
-                'pool': match.group(1) if match.group(1) != '-' else None,
-                'release': match.group(2) if match.group(2) != '-' else None,
-                'upstream_status': match.group(3),
-                'upstream': match.group(4),
-                'request_time': match.group(5),
-                'upstream_response_time': match.group(6)
-            }
-        return None
+        # Custom fields are fixed-order key="value" pairs at the end of the line
+        start = line.rfind('pool="')
+        if start == -1:
+            return None
 
-    def send_slack_alert(self, alert_data, alert_key):
+        tokens = line[start:].split('" ', len(self.LOG_FIELDS) - 1)
+        if len(tokens) != len(self.LOG_FIELDS):
+            return None
+
+        values = []
+        for key, token in zip(self.LOG_FIELDS, tokens):
+            name, sep, value = token.partition('="')
+            if name != key or not sep:
+                return None
+            values.append(value)
+
+        # The last value runs up to its closing quote
+        last, quote, _ = values[-1].partition('"')
+        if not quote:
+            return None
+        values[-1] = last
+        if any('"' in v for v in values):
+            return None
+
+        pool, release, upstream_status, upstream, request_time, upstream_response_time = values
+        # Only a handful of pools/releases exist, so share one string object per value
+        return {
+            'pool': sys.intern(pool) if pool != '-' else None,
+            'release': sys.intern(release) if release != '-' else None,
+            'upstream_status': upstream_status,
+            'upstream': upstream,
+            'request_time': request_time,
+            'upstream_response_time': upstream_response_time
+        }
+
+    def should_alert(self, alert_key):
+        """Check webhook and cooldown up front so suppressed alerts cost no payload building"""
         if not self.webhook_url:
             print("⚠️ No Slack webhook URL set.")
-            return
+            return False
 
         now = time.time()
         last_alert_time = self.last_alert_time.get(alert_key, 0)
 
         if now - last_alert_time < self.cooldown:
             print(f"⏳ Cooldown active for '{alert_key}' ({int(now - last_alert_time)}s elapsed)")
+            return False
+        return True
+
+    def send_slack_alert(self, alert_data, alert_key):
+        if not self.should_alert(alert_key):
             return
 
+        now = time.time()
+
         payload = {
             "text": "🚨 Blue/Green Deployment Alert",
             "attachments": [{
@@ -72,17 +141,49 @@ class LogWatcher:
             })
 
         try:
-            r = requests.post(self.webhook_url, json=payload, timeout=5)
-            if r.status_code == 200:
-                print(f"✅ Slack alert sent: {alert_data['type']}")
-                self.last_alert_time[alert_key] = now
-            else:
-                print(f"❌ Slack returned status {r.status_code}: {r.text}")
-        except Exception as e:
-            print(f"❌ Failed to send Slack alert: {e}")
+            self.alert_queue.put_nowait((alert_key, alert_data["type"], payload, now))
+        except queue.Full:
+            print(f"❌ Alert queue full, dropping Slack alert: {alert_data['type']}")
+            return
+        # Start the cooldown at enqueue time so a POST in flight doesn't let duplicates through;
+        # the worker clears it again if delivery fails
+        self.last_alert_time[alert_key] = now
+
+    def build_session(self):
+        """One keep-alive session for all webhook calls, so alerts reuse the TLS connection"""
+        session = requests.Session()
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["POST"])
+        )
+        session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retry))
+        return session
+
+    def alert_worker(self):
+        """Post queued Slack alerts off the log-reading thread"""
+        while True:
+            alert_key, alert_type, payload, queued_at = self.alert_queue.get()
+            try:
+                r = self.session.post(self.webhook_url, json=payload, timeout=5)
+                if r.status_code == 200:
+                    print(f"✅ Slack alert sent: {alert_type}")
+                else:
+                    print(f"❌ Slack returned status {r.status_code}: {r.text}")
+                    self.clear_cooldown(alert_key, queued_at)
+            except Exception as e:
+                print(f"❌ Failed to send Slack alert: {e}")
+                self.clear_cooldown(alert_key, queued_at)
+            finally:
+                self.alert_queue.task_done()
+
+    def clear_cooldown(self, alert_key, queued_at):
+        if self.last_alert_time.get(alert_key) == queued_at:
+            del self.last_alert_time[alert_key]
 
     def check_failover(self, pool, data):
-        if pool and self.last_pool and pool != self.last_pool:
+        if pool and self.last_pool and pool != self.last_pool and self.should_alert(f"failover_{pool}"):
             alert_data = {
                 "type": "Failover Detected",
                 "timestamp": datetime.now().isoformat(),
@@ -99,14 +200,29 @@ class LogWatcher:
         if pool:
             self.last_pool = pool
 
+    @staticmethod
+    def is_error(status):
+        return bool(status) and status.startswith("5")
+
+    def record_status(self, status):
+        """Store a status's error flag in the window, keeping error_count in step"""
+        if not self.window_size:
+            return
+        flag = self.is_error(status)
+        self.error_count += flag - self.request_window[self.window_pos]
+        self.request_window[self.window_pos] = flag
+        self.window_pos = (self.window_pos + 1) % self.window_size
+        if self.window_filled < self.window_size:
+            self.window_filled += 1
+
     def check_error_rate(self):
-        if len(self.request_window) < 10:
+        if self.window_filled < 10:
             return
 
-        errors = sum(1 for s in self.request_window if s and s.startswith("5"))
-        error_rate = (errors / len(self.request_window)) * 100
+        errors = self.error_count
+        error_rate = (errors / self.window_filled) * 100
 
-        if error_rate > self.error_threshold:
+        if error_rate > self.error_threshold and self.should_alert("error_rate"):
             alert_data = {
                 "type": "High Error Rate",
                 "timestamp": datetime.now().isoformat(),
@@ -114,7 +230,7 @@ class LogWatcher:
                 "metadata": {
                     "error_rate": f"{error_rate:.2f}%",
                     "threshold": f"{self.error_threshold}%",
-                    "window": len(self.request_window),
+                    "window": self.window_filled,
                     "total_errors": errors
                 }
             }
@@ -131,10 +247,33 @@ class LogWatcher:
             while True:
                 line = f.readline()
                 if not line:
-                    time.sleep(0.5)
+                    self.wait_for_changes(0.5)
                     continue
                 yield line.strip()
 
+    def read_new_lines(self, f):
+        """Yield complete lines from a binary file, reading it in large blocks.
+
+        A trailing partial line is left unread so the next pass picks it up whole.
+        """
+        pending = b''
+        while True:
+            chunk = f.read(self.READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            buf = pending + chunk if pending else chunk
+            start = 0
+            while True:
+                end = buf.find(b'\n', start)
+                if end == -1:
+                    break
+                yield buf[start:end]
+                start = end + 1
+            pending = buf[start:]
+
+        if pending:
+            f.seek(-len(pending), os.SEEK_CUR)
+
     def watch_logs(self):
         print("🔍 Starting Blue/Green Alert Watcher...")
         print(f"Webhook: {'Configured' if self.webhook_url else 'Missing'}")
@@ -160,21 +299,27 @@ class LogWatcher:
             try:
                 if os.path.exists(self.log_file):
                     current_size = os.path.getsize(self.log_file)
+                    if current_size < last_size:
+                        # File was truncated or recreated, start over from the top
+                        last_size = 0
                     if current_size > last_size:
-                        with open(self.log_file, 'r') as f:
+                        with open(self.log_file, 'rb') as f:
                             f.seek(last_size)
-                            new_lines = f.readlines()
-                            for line in new_lines:
+                            for raw in self.read_new_lines(f):
+                                # Only decode lines that can carry our custom fields
+                                if b'pool="' not in raw:
+                                    continue
+                                line = raw.decode('utf-8', errors='replace')
                                 parsed = self.parse_log_line(line.strip())
                                 if parsed:
                                     print(f"📄 Log: pool={parsed['pool']}, status={parsed['upstream_status']}")
-                                    self.request_window.append(parsed['upstream_status'])
+                                    self.record_status(parsed['upstream_status'])
                                     self.check_failover(parsed['pool'], parsed)
                                     self.check_error_rate()
-                        last_size = current_size
+                            last_size = f.tell()
                 else:
                     print("⏳ Waiting for log file...")
-                time.sleep(1)
+                self.wait_for_changes(1)
             except Exception as e:
                 print(f"❌ Log reading error: {e}")
                 time.sleep(2)